@@ -2,23 +2,87 @@ import os
 import json
 import sqlite3
 import logging
-from flask import Flask, render_template, request, redirect, url_for
+import logging.handlers
+import queue
+import atexit
+import functools
+import itertools
+import operator
+import tempfile
+import orjson
+from flask import Flask, g, render_template, request, redirect, url_for
 from datetime import datetime
-import glob
-from typing import List, Dict, Any
+from typing import BinaryIO, Iterator, List, Dict, Optional, Tuple, Union, Any
 
-# Setup logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG,
-                    format='%(asctime)s %(levelname)s: %(message)s')
+# Setup logging; app.log is written from a background listener thread so
+# request and scan threads only enqueue records.
+log_queue = queue.Queue(-1)
+log_file_handler = logging.FileHandler('app.log')
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler)
+logging.getLogger().setLevel(logging.DEBUG)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.info("Starting application")
 
 app = Flask(__name__)
 DB_PATH = "database.db"
+PAGE_SIZE = 200
+PURCHASE_ROWS_PER_INSERT = 999 // 7
+JOURNAL_READ_SIZE = 1 << 20
+UPLOAD_SPOOL_SIZE = 8 << 20
+
+# Statements reused on every scan; keeping the SQL text identical lets the
+# connection's statement cache hand back the already prepared statement.
+INSERT_PURCHASE_SQL = '''INSERT INTO purchases (item, count, buy_price, total_cost, bought_at, bought_system, bought_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?)'''
+UPDATE_SOLD_SQL = '''UPDATE purchases SET sold = 1, sold_at = ?, sold_time = ?
+    WHERE id = (SELECT id FROM purchases
+        WHERE item = ? AND count = ? AND delivered = 0 AND sold = 0 ORDER BY id LIMIT 1)'''
+UPDATE_DELIVERED_SQL = '''UPDATE purchases SET delivered = 1, delivered_to = ?, delivered_time = ?
+    WHERE id = (SELECT id FROM purchases
+        WHERE item = ? AND count = ? AND delivered = 0 AND sold = 0 ORDER BY id LIMIT 1)'''
+UPDATE_DELIVERED_ALL_SQL = '''UPDATE purchases SET delivered = 1, delivered_to = ?, delivered_time = ?
+    WHERE delivered = 0 AND sold = 0'''
+UPSERT_PROCESSED_LOG_SQL = '''INSERT INTO processed_logs (filename, processed_time, byte_offset, complete, resume_state)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(filename) DO UPDATE SET processed_time = excluded.processed_time,
+        byte_offset = excluded.byte_offset, complete = excluded.complete,
+        resume_state = excluded.resume_state'''
+_db_initialized = False
+
+def _connect() -> sqlite3.Connection:
+    # Autocommit mode; writers open their own transactions with BEGIN.
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False,
+                           cached_statements=256)
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-20000;
+        PRAGMA mmap_size=268435456;
+    """)
+    return conn
+
+def get_db() -> sqlite3.Connection:
+    # One connection per app context, closed by close_db on teardown.
+    db = getattr(g, "_db", None)
+    if db is None:
+        db = g._db = _connect()
+    return db
+
+@app.teardown_appcontext
+def close_db(exception: Optional[BaseException]) -> None:
+    db = g.pop("_db", None)
+    if db is not None:
+        db.close()
 
 def init_db():
+    global _db_initialized
     logging.info("Initializing database")
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         c = conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS purchases (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,9 +92,22 @@ def init_db():
             sold INTEGER DEFAULT 0, sold_at TEXT, sold_time TEXT
         )''')
         c.execute('''CREATE TABLE IF NOT EXISTS processed_logs (
-            filename TEXT PRIMARY KEY, processed_time TEXT
+            filename TEXT PRIMARY KEY, processed_time TEXT,
+            byte_offset INTEGER DEFAULT 0, complete INTEGER DEFAULT 0, resume_state TEXT
         )''')
+        columns = {row[1] for row in c.execute("PRAGMA table_info(processed_logs)")}
+        if "byte_offset" not in columns:
+            # Logs recorded before offsets were tracked were always read in full.
+            c.execute("ALTER TABLE processed_logs ADD COLUMN byte_offset INTEGER DEFAULT 0")
+            c.execute("ALTER TABLE processed_logs ADD COLUMN complete INTEGER DEFAULT 0")
+            c.execute("ALTER TABLE processed_logs ADD COLUMN resume_state TEXT")
+            c.execute("UPDATE processed_logs SET complete = 1")
+        # processed_logs lookups are already covered by its primary key.
+        c.execute("CREATE INDEX IF NOT EXISTS idx_purchases_lookup ON purchases(item, count, delivered, sold)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_purchases_bought_time ON purchases(bought_time)")
+        c.execute("ANALYZE")
         conn.commit()
+        _db_initialized = True
         logging.info("Database initialized successfully")
     except sqlite3.Error as e:
         logging.error(f"Database initialization failed: {e}")
@@ -38,157 +115,294 @@ def init_db():
     finally:
         conn.close()
 
-def load_config() -> Dict[str, Any]:
+@functools.lru_cache(maxsize=1)
+def _read_config(filepath: str, mtime_ns: int) -> Dict[str, Any]:
+    # mtime_ns is only part of the cache key, so editing config.json invalidates it.
     logging.info("Loading config")
-    filepath = os.path.join(os.path.dirname(__file__), "config.json")
     try:
         with open(filepath, "r") as f:
             config = json.load(f)
+        config["_colonized_set"] = frozenset(sys["SystemAddress"] for sys in config["colonized_systems"])
         logging.info(f"Config loaded successfully from {filepath}")
         return config
-    except FileNotFoundError:
-        logging.error(f"config.json not found at {filepath}")
-        raise
     except json.JSONDecodeError as e:
         logging.error(f"Invalid config.json at {filepath}: {e}")
         raise
 
-def parse_log_file(filepath: str) -> List[Dict[str, Any]]:
-    events = []
-    logging.info(f"Parsing log file: {filepath}")
+def load_config() -> Dict[str, Any]:
+    filepath = os.path.join(os.path.dirname(__file__), "config.json")
+    try:
+        return _read_config(filepath, os.stat(filepath).st_mtime_ns)
+    except FileNotFoundError:
+        logging.error(f"config.json not found at {filepath}")
+        raise
+
+def _iter_lines(f: BinaryIO, complete: bool) -> Iterator[bytes]:
+    # Reads large binary chunks from the file's current position and splits them
+    # on newlines. Unless the journal is complete, an unterminated last line is
+    # still being written, so the file is left positioned at its start.
+    buf = b""
+    while True:
+        chunk = f.read(JOURNAL_READ_SIZE)
+        if not chunk:
+            break
+        lines = (buf + chunk).split(b"\n")
+        buf = lines.pop()
+        yield from lines
+    if buf:
+        if complete:
+            yield buf
+        else:
+            f.seek(-len(buf), os.SEEK_CUR)
+
+def parse_log_file(f: BinaryIO, name: str, complete: bool = True) -> Iterator[Dict[str, Any]]:
+    logging.info(f"Parsing log file: {name}")
+    parsed = 0
     try:
-        with open(filepath, "r") as f:
-            for line in f:
-                try:
-                    event = json.loads(line.strip())
-                    events.append(event)
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Skipping invalid JSON line in {filepath}: {e}")
-        logging.info(f"Parsed {len(events)} events from {filepath}")
+        for line in _iter_lines(f, complete):
+            try:
+                event = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                logging.warning(f"Skipping invalid JSON line in {name}: {e}")
+                continue
+            parsed += 1
+            yield event
+        logging.info(f"Parsed {parsed} events from {name}")
     except IOError as e:
-        logging.error(f"Failed to read log file {filepath}: {e}")
-    return events
+        logging.error(f"Failed to read log file {name}: {e}")
 
-def parse_cargo_file(filepath: str) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=1)
+def _read_cargo_file(filepath: str, mtime_ns: int) -> Dict[str, Any]:
+    # Keyed on mtime_ns like _read_config, so Cargo.json is only re-parsed after the game rewrites it.
     logging.info(f"Parsing cargo file: {filepath}")
+    with open(filepath, "r") as f:
+        cargo_data = json.load(f)
+    logging.info("Parsed cargo data: %s", cargo_data)
+    return cargo_data
+
+def parse_cargo_file(filepath: str) -> Dict[str, Any]:
     try:
-        with open(filepath, "r") as f:
-            cargo_data = json.load(f)
-        logging.info(f"Parsed cargo data: {json.dumps(cargo_data)}")
-        return cargo_data
+        return _read_cargo_file(filepath, os.stat(filepath).st_mtime_ns)
     except (IOError, json.JSONDecodeError) as e:
         logging.error(f"Failed to parse cargo file {filepath}: {e}")
         return {"timestamp": "unknown", "Inventory": []}
 
+_get_count = operator.itemgetter("Count")
+
 def get_total_cargo_count(cargo_data: Dict[str, Any]) -> int:
     inventory = cargo_data.get("Inventory", [])
-    total = sum(item.get("Count", 0) for item in inventory)
-    logging.debug(f"Total cargo count: {total}")
+    try:
+        total = sum(map(_get_count, inventory))
+    except KeyError:
+        # Inventory entries normally always carry Count; fall back for odd files.
+        total = sum(item.get("Count", 0) for item in inventory)
+    logging.debug("Total cargo count: %s", total)
     return total
 
-def process_logs(log_files: List[str], config: Dict[str, Any]) -> None:
-    conn = sqlite3.connect(DB_PATH)
+# Buffered rows are flushed whenever the kind of statement changes, so
+# sales and deliveries still match against every purchase seen before them.
+def _flush(state: Dict[str, Any]) -> None:
+    c = state["cursor"]
+    buy_rows, sell_rows, deliver_rows = state["buy_rows"], state["sell_rows"], state["deliver_rows"]
+    if buy_rows:
+        # One multi-row INSERT per chunk, sized to stay under SQLite's default
+        # limit of 999 bound parameters.
+        for i in range(0, len(buy_rows), PURCHASE_ROWS_PER_INSERT):
+            chunk = buy_rows[i:i + PURCHASE_ROWS_PER_INSERT]
+            c.execute(INSERT_PURCHASE_SQL + ", (?, ?, ?, ?, ?, ?, ?)" * (len(chunk) - 1),
+                      list(itertools.chain.from_iterable(chunk)))
+        if state["debug_enabled"]:
+            logging.debug("Added %s purchase(s)", len(buy_rows))
+        buy_rows.clear()
+    if sell_rows:
+        c.executemany(UPDATE_SOLD_SQL, sell_rows)
+        if c.rowcount < len(sell_rows):
+            logging.warning(f"No matching purchase found for {len(sell_rows) - c.rowcount} of {len(sell_rows)} sale(s)")
+        logging.info(f"Marked {c.rowcount} purchase(s) as sold")
+        sell_rows.clear()
+    if deliver_rows:
+        c.executemany(UPDATE_DELIVERED_SQL, deliver_rows)
+        if c.rowcount < len(deliver_rows):
+            logging.warning(f"No matching purchase found for {len(deliver_rows) - c.rowcount} of {len(deliver_rows)} mission delivery(ies)")
+        logging.info(f"Marked {c.rowcount} purchase(s) as delivered via mission")
+        deliver_rows.clear()
+
+def _on_docked(event: Dict[str, Any], state: Dict[str, Any]) -> None:
+    if event.get("MarketID") is None:
+        logging.warning("Docked event missing MarketID: %s", event)
+        return
+    docked_station = state["docked_station"] = {
+        "StationName": event["StationName"],
+        "StarSystem": event["StarSystem"],
+        "SystemAddress": event["SystemAddress"],
+        "timestamp": event["timestamp"]
+    }
+    if state["debug_enabled"]:
+        logging.debug("Docked at %s in %s", docked_station["StationName"], docked_station["StarSystem"])
+
+def _on_market_buy(event: Dict[str, Any], state: Dict[str, Any]) -> None:
+    get = event.get
+    docked_station = state["docked_station"]
+    market_id = get("MarketID")
+    if not docked_station or market_id != get("MarketID"):
+        logging.warning("MarketBuy event with no prior docking or mismatched MarketID %s: %s", market_id, event)
+        return
+    item_name = get("Type_Localised") or get("Type") or "Unknown"
+    if state["sell_rows"] or state["deliver_rows"]:
+        _flush(state)
+    state["buy_rows"].append((
+        item_name, get("Count", 0), get("BuyPrice", 0), get("TotalCost", 0),
+        docked_station["StationName"], docked_station["StarSystem"], event["timestamp"]
+    ))
+
+def _on_market_sell(event: Dict[str, Any], state: Dict[str, Any]) -> None:
+    get = event.get
+    docked_station = state["docked_station"]
+    market_id = get("MarketID")
+    if not docked_station or market_id != get("MarketID"):
+        logging.warning("MarketSell event with no prior docking or mismatched MarketID %s: %s", market_id, event)
+        return
+    item_name = get("Type", "Unknown")
+    count = get("Count", 0)
+    logging.info(f"Detected sale of {count} {item_name} at {docked_station['StationName']}")
+    if state["buy_rows"] or state["deliver_rows"]:
+        _flush(state)
+    state["sell_rows"].append((docked_station["StationName"], event["timestamp"], item_name, count))
+
+def _on_cargo_depot(event: Dict[str, Any], state: Dict[str, Any]) -> None:
+    get = event.get
+    if get("UpdateType") != "Deliver":
+        return
+    docked_station = state["docked_station"]
+    market_id = get("EndMarketID")
+    if not docked_station or market_id != get("EndMarketID"):
+        logging.warning("CargoDepot event with no prior docking or mismatched EndMarketID %s: %s", market_id, event)
+        return
+    item_name = get("CargoType_Localised") or get("CargoType") or "Unknown"
+    count = get("Count", 0)
+    logging.info(f"Detected mission delivery of {count} {item_name} at {docked_station['StationName']}")
+    if state["buy_rows"] or state["sell_rows"]:
+        _flush(state)
+    state["deliver_rows"].append((docked_station["StationName"], event["timestamp"], item_name, count))
+
+def _on_cargo(event: Dict[str, Any], state: Dict[str, Any]) -> None:
+    docked_station = state["docked_station"]
+    cargo_count = state["cargo_count"]
+    # Journal Cargo events carry the total Count, and the full Inventory at
+    # game start; Cargo.json is only needed for events without either.
+    if "Count" in event:
+        current_cargo = event["Count"]
+    elif "Inventory" in event:
+        current_cargo = get_total_cargo_count(event)
+    else:
+        current_cargo = get_total_cargo_count(parse_cargo_file(state["cargo_file"]))
+    if state["debug_enabled"]:
+        logging.debug("Cargo update triggered, total count: %s from previous %s", current_cargo, cargo_count)
+    if current_cargo == 0 and cargo_count is not None and cargo_count > 0 and docked_station:
+        if docked_station["SystemAddress"] in state["colonized_systems"]:
+            logging.info(f"Detected non-mission delivery at {docked_station['StationName']} in {docked_station['StarSystem']} at {event['timestamp']}")
+            _flush(state)
+            c = state["cursor"]
+            c.execute(UPDATE_DELIVERED_ALL_SQL, (docked_station["StationName"], event["timestamp"]))
+            logging.info(f"Updated {c.rowcount} purchases as delivered")
+    state["cargo_count"] = current_cargo
+
+EVENT_HANDLERS = {
+    "Docked": _on_docked,
+    "MarketBuy": _on_market_buy,
+    "MarketSell": _on_market_sell,
+    "CargoDepot": _on_cargo_depot,
+    "Cargo": _on_cargo,
+}
+
+def process_logs(log_files: List[Union[str, Tuple[str, BinaryIO]]], config: Dict[str, Any],
+                 active_log: Optional[str] = None) -> None:
+    # log_files holds journal paths, or (filename, open binary file) pairs for
+    # uploads. active_log is the journal the game may still be appending to; it
+    # is read up to its current end and resumed from there on the next call.
+    conn = get_db()
     c = conn.cursor()
-    colonized_systems = {sys["SystemAddress"] for sys in config["colonized_systems"]}
-    docked_station = None
-    cargo_count = None
-    log_dir = config["log_directory"]
-    cargo_file = os.path.join(log_dir, "Cargo.json")
+    # Checked once per scan so per-event debug lines cost nothing when DEBUG is off.
+    debug_enabled = logging.getLogger().isEnabledFor(logging.DEBUG)
+    debug = logging.debug
+    state = {
+        "cursor": c,
+        "debug_enabled": debug_enabled,
+        "colonized_systems": config["_colonized_set"],
+        "cargo_file": os.path.join(config["log_directory"], "Cargo.json"),
+        "docked_station": None,
+        "cargo_count": None,
+        "buy_rows": [],
+        "sell_rows": [],
+        "deliver_rows": [],
+    }
+    handlers = EVENT_HANDLERS
 
+    processed = {row[0]: row[1:] for row in c.execute(
+        "SELECT filename, byte_offset, complete, resume_state FROM processed_logs")}
     logging.info(f"Processing {len(log_files)} log files")
     for log_file in log_files:
-        filename = os.path.basename(log_file)
-        c.execute("SELECT 1 FROM processed_logs WHERE filename = ?", (filename,))
-        if c.fetchone():
-            logging.debug(f"Skipping already processed log: {filename}")
+        if isinstance(log_file, str):
+            filename, f = os.path.basename(log_file), None
+        else:
+            filename, f = log_file
+        complete = log_file != active_log
+        byte_offset, done, resume_state = processed.get(filename, (0, 0, None))
+        if done:
+            if debug_enabled:
+                debug("Skipping already processed log: %s", filename)
             continue
+        if filename in processed:
+            if not complete and os.path.getsize(log_file) == byte_offset:
+                if debug_enabled:
+                    debug("No new events in active log: %s", filename)
+                continue
+            if resume_state:
+                resumed = json.loads(resume_state)
+                state["docked_station"] = resumed["docked_station"]
+                state["cargo_count"] = resumed["cargo_count"]
 
-        events = parse_log_file(log_file)
-        for event in events:
-            logging.debug(f"Processing event: {event['event']} at {event['timestamp']}")
-            if event["event"] == "Docked":
-                market_id = event.get("MarketID")
-                if market_id is None:
-                    logging.warning(f"Docked event missing MarketID: {json.dumps(event)}")
-                    continue
-                docked_station = {
-                    "StationName": event["StationName"],
-                    "StarSystem": event["StarSystem"],
-                    "SystemAddress": event["SystemAddress"],
-                    "timestamp": event["timestamp"]
-                }
-                logging.debug(f"Docked at {docked_station['StationName']} in {docked_station['StarSystem']}")
-            elif event["event"] == "MarketBuy":
-                market_id = event.get("MarketID")
-                if not docked_station or market_id != event.get("MarketID"):
-                    logging.warning(f"MarketBuy event with no prior docking or mismatched MarketID {market_id}: {json.dumps(event)}")
-                    continue
-                item_name = event.get("Type_Localised") or event.get("Type") or "Unknown"
-                count = event.get("Count", 0)
-                buy_price = event.get("BuyPrice", 0)
-                total_cost = event.get("TotalCost", 0)
-                try:
-                    c.execute('''INSERT INTO purchases (item, count, buy_price, total_cost, bought_at, bought_system, bought_time)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)''', (
-                        item_name, count, buy_price, total_cost,
-                        docked_station["StationName"], docked_station["StarSystem"], event["timestamp"]
-                    ))
-                    logging.debug(f"Added purchase: {item_name}, count: {count}")
-                except sqlite3.Error as e:
-                    logging.error(f"Database insert failed: {e}, event: {json.dumps(event)}")
-                    continue
-            elif event["event"] == "MarketSell":
-                market_id = event.get("MarketID")
-                if not docked_station or market_id != event.get("MarketID"):
-                    logging.warning(f"MarketSell event with no prior docking or mismatched MarketID {market_id}: {json.dumps(event)}")
-                    continue
-                item_name = event.get("Type", "Unknown")
-                count = event.get("Count", 0)
-                logging.info(f"Detected sale of {count} {item_name} at {docked_station['StationName']}")
-                c.execute('''UPDATE purchases SET sold = 1, sold_at = ?, sold_time = ?
-                    WHERE item = ? AND count = ? AND delivered = 0 AND sold = 0 LIMIT 1''', (
-                    docked_station["StationName"], event["timestamp"], item_name, count
-                ))
-                if c.rowcount > 0:
-                    logging.info(f"Marked {c.rowcount} purchase(s) of {item_name} as sold")
-                else:
-                    logging.warning(f"No matching purchase found to mark as sold: {item_name}, count: {count}")
-            elif event["event"] == "CargoDepot" and event.get("UpdateType") == "Deliver":
-                market_id = event.get("EndMarketID")
-                if not docked_station or market_id != event.get("EndMarketID"):
-                    logging.warning(f"CargoDepot event with no prior docking or mismatched EndMarketID {market_id}: {json.dumps(event)}")
-                    continue
-                item_name = event.get("CargoType_Localised") or event.get("CargoType") or "Unknown"
-                count = event.get("Count", 0)
-                logging.info(f"Detected mission delivery of {count} {item_name} at {docked_station['StationName']}")
-                c.execute('''UPDATE purchases SET delivered = 1, delivered_to = ?, delivered_time = ?
-                    WHERE item = ? AND count = ? AND delivered = 0 AND sold = 0 LIMIT 1''', (
-                    docked_station["StationName"], event["timestamp"], item_name, count
-                ))
-                if c.rowcount > 0:
-                    logging.info(f"Marked {c.rowcount} purchase(s) of {item_name} as delivered via mission")
-                else:
-                    logging.warning(f"No matching purchase found to mark as delivered: {item_name}, count: {count}")
-            elif event["event"] == "Cargo":
-                cargo_data = parse_cargo_file(cargo_file)
-                current_cargo = get_total_cargo_count(cargo_data)
-                logging.debug(f"Cargo update triggered, total count: {current_cargo} from previous {cargo_count}")
-                if current_cargo == 0 and cargo_count is not None and cargo_count > 0 and docked_station:
-                    if docked_station["SystemAddress"] in colonized_systems:
-                        logging.info(f"Detected non-mission delivery at {docked_station['StationName']} in {docked_station['StarSystem']} at {event['timestamp']}")
-                        c.execute('''UPDATE purchases SET delivered = 1, delivered_to = ?, delivered_time = ?
-                            WHERE delivered = 0 AND sold = 0''', (
-                            docked_station["StationName"], event["timestamp"]
-                        ))
-                        logging.info(f"Updated {c.rowcount} purchases as delivered")
-                cargo_count = current_cargo
-
-        c.execute("INSERT INTO processed_logs (filename, processed_time) VALUES (?, ?)",
-                  (filename, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-        logging.info(f"Processed new log: {filename}")
+        if f is None:
+            try:
+                f = open(log_file, "rb")
+            except IOError as e:
+                logging.error(f"Failed to read log file {log_file}: {e}")
+                continue
+        with f, conn:
+            c.execute("BEGIN")
+            f.seek(byte_offset)
+            for event in parse_log_file(f, filename, complete):
+                if debug_enabled:
+                    debug("Processing event: %s at %s", event["event"], event["timestamp"])
+                handler = handlers.get(event["event"])
+                if handler:
+                    handler(event, state)
+
+            _flush(state)
+            byte_offset = f.tell()
+            resume_state = json.dumps({"docked_station": state["docked_station"],
+                                       "cargo_count": state["cargo_count"]})
+            c.execute(UPSERT_PROCESSED_LOG_SQL,
+                      (filename, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                       byte_offset, int(complete), resume_state))
+        processed[filename] = (byte_offset, int(complete), resume_state)
+        if complete:
+            logging.info(f"Processed new log: {filename}")
+        else:
+            logging.info(f"Processed active log up to byte {byte_offset}: {filename}")
 
-    conn.close()
+# log_dir -> (directory mtime_ns, sorted journal paths)
+_journal_cache: Dict[str, Tuple[int, List[str]]] = {}
+
+def list_journals(log_dir: str) -> List[str]:
+    mtime = os.stat(log_dir).st_mtime_ns
+    cached = _journal_cache.get(log_dir)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with os.scandir(log_dir) as it:
+        journals = sorted(e.path for e in it if e.name.startswith("Journal.") and e.name.endswith(".log"))
+    _journal_cache[log_dir] = (mtime, journals)
+    return journals
 
 def scan_directory() -> None:
     try:
@@ -198,10 +412,10 @@ def scan_directory() -> None:
         if not os.path.isdir(log_dir):
             logging.error(f"Log directory does not exist: {log_dir}")
             raise FileNotFoundError(f"Log directory does not exist: {log_dir}")
-        log_files = glob.glob(os.path.join(log_dir, "Journal.*.log"))
-        log_files.sort()
+        log_files = list_journals(log_dir)
         logging.info(f"Found {len(log_files)} log files")
-        process_logs(log_files, config)
+        # The newest journal belongs to the current (or last) game session.
+        process_logs(log_files, config, active_log=log_files[-1] if log_files else None)
     except Exception as e:
         logging.error(f"Scan directory failed: {str(e)}")
         raise
@@ -209,30 +423,36 @@ def scan_directory() -> None:
 @app.route("/", methods=["GET", "POST"])
 def index():
     logging.info("Handling request to /")
-    try:
-        init_db()
-    except Exception as e:
-        logging.error(f"Failed to initialize database: {e}")
-        return f"Database initialization failed: {str(e)}. Check app.log.", 500
+    # The schema only needs creating once per process; a failed attempt is retried on the next request.
+    if not _db_initialized:
+        try:
+            init_db()
+        except Exception as e:
+            logging.error(f"Failed to initialize database: {e}")
+            return f"Database initialization failed: {str(e)}. Check app.log.", 500
 
     if request.method == "POST":
         if "log_files" in request.files:
             uploaded_files = request.files.getlist("log_files")
-            log_paths = []
+            uploads = []
             for file in uploaded_files:
                 if file.filename.endswith(".log"):
-                    filepath = os.path.join("/tmp", file.filename)
-                    file.save(filepath)
-                    log_paths.append(filepath)
-            if log_paths:
+                    # Small journals stay in memory; larger ones roll over to an
+                    # anonymous temporary file that is deleted when closed.
+                    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+                    file.save(spooled)
+                    spooled.seek(0)
+                    uploads.append((os.path.basename(file.filename), spooled))
+            if uploads:
                 try:
-                    process_logs(log_paths, load_config())
-                    for filepath in log_paths:
-                        os.remove(filepath)
+                    process_logs(uploads, load_config())
                     logging.info("Processed uploaded logs successfully")
                 except Exception as e:
                     logging.error(f"Failed to process uploaded logs: {e}")
                     return f"Error processing logs: {str(e)}. Check app.log.", 500
+                finally:
+                    for _, spooled in uploads:
+                        spooled.close()
             return redirect(url_for("index"))
 
     try:
@@ -241,20 +461,21 @@ def index():
         logging.error(f"Failed to scan directory: {e}")
         return f"Error scanning logs: {str(e)}. Check app.log.", 500
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM purchases ORDER BY bought_time")
-    purchases = [{"id": row[0], "item": row[1], "count": row[2], "buy_price": row[3],
-                  "total_cost": row[4], "bought_at": row[5], "bought_system": row[6],
-                  "bought_time": row[7], "delivered": bool(row[8]), "delivered_to": row[9],
-                  "delivered_time": row[10], "sold": bool(row[11]), "sold_at": row[12],
-                  "sold_time": row[13]} for row in c.fetchall()]
+    page = max(request.args.get("page", 1, type=int), 1)
+    c = get_db().cursor()
+    c.row_factory = sqlite3.Row
+    # Fetch one extra row to know whether a next page exists without a COUNT(*).
+    c.execute("SELECT * FROM purchases ORDER BY bought_time LIMIT ? OFFSET ?",
+              (PAGE_SIZE + 1, (page - 1) * PAGE_SIZE))
+    rows = c.fetchall()
+    has_next = len(rows) > PAGE_SIZE
+    purchases = rows[:PAGE_SIZE]
     c.execute("SELECT MAX(processed_time) FROM processed_logs")
     last_scan = c.fetchone()[0]
-    conn.close()
     logging.info("Rendering index page")
 
-    return render_template("index.html", purchases=purchases, last_scan=last_scan)
+    return render_template("index.html", purchases=purchases, last_scan=last_scan,
+                           page=page, has_next=has_next)
 
 if __name__ == "__main__":
     logging.info("Starting Flask server")